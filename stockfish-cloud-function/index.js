@@ -29,7 +29,7 @@ function getBestMove(fen, difficulty) {
 
     const engine = spawn(process.execPath, [ENGINE_PATH], { stdio: 'pipe' });
 
-    const outputLines = [];
+    let evaluation = null;  // latest score seen in search info lines
     let phase = 'uci';  // uci -> ready -> search -> done
     let settled = false;
 
@@ -55,18 +55,26 @@ function getBestMove(fen, difficulty) {
 
         if (phase === 'uci' && line === 'uciok') {
           phase = 'ready';
-          engine.stdin.write(`setoption name Skill Level value ${preset.skillLevel}\n`);
-          engine.stdin.write('setoption name Threads value 1\n');
-          engine.stdin.write('ucinewgame\n');
-          engine.stdin.write('isready\n');
+          engine.stdin.write(
+            `setoption name Skill Level value ${preset.skillLevel}\n` +
+            'setoption name Threads value 1\n' +
+            'ucinewgame\n' +
+            'isready\n'
+          );
         } else if (phase === 'ready' && line === 'readyok') {
           phase = 'search';
-          engine.stdin.write(`position fen ${fen}\n`);
-          engine.stdin.write(`go depth ${preset.depth}\n`);
+          engine.stdin.write(`position fen ${fen}\ngo depth ${preset.depth}\n`);
         } else if (phase === 'search') {
-          outputLines.push(line);
-
-          if (line.startsWith('bestmove')) {
+          // Only info lines carrying a score are worth the regex
+          if (line.startsWith('info') && line.includes(' score ')) {
+            const evalMatch = line.match(/score\s+(cp|mate)\s+(-?\d+)/);
+            if (evalMatch) {
+              evaluation = {
+                type: evalMatch[1],
+                value: parseInt(evalMatch[2], 10),
+              };
+            }
+          } else if (line.startsWith('bestmove')) {
             phase = 'done';
             engine.stdin.write('quit\n');
 
@@ -77,19 +85,6 @@ function getBestMove(fen, difficulty) {
               return;
             }
 
-            // Extract evaluation from search info lines
-            let evaluation = null;
-            for (let i = outputLines.length - 1; i >= 0; i--) {
-              const evalMatch = outputLines[i].match(/score\s+(cp|mate)\s+(-?\d+)/);
-              if (evalMatch) {
-                evaluation = {
-                  type: evalMatch[1],
-                  value: parseInt(evalMatch[2], 10),
-                };
-                break;
-              }
-            }
-
             finish(null, { move: match[1], evaluation });
           }
         }
@@ -145,14 +140,15 @@ functions.http('getMove', async (req, res) => {
     res.status(400).json({ error: 'FEN string too long.' });
     return;
   }
+  const trimmedFen = fen.trim();
   // Character whitelist: only allow characters valid in FEN strings
   // Pieces: rnbqkpRNBQKP, digits: 0-9, slashes, spaces, dashes, letters for castling/en-passant
-  if (!/^[rnbqkpRNBQKP0-9\/\s\-a-h\w]+$/.test(fen.trim())) {
+  if (!/^[rnbqkpRNBQKP0-9\/\s\-a-h\w]+$/.test(trimmedFen)) {
     res.status(400).json({ error: 'FEN contains invalid characters.' });
     return;
   }
   // Basic FEN format check: should have 6 space-separated fields
-  const fenParts = fen.trim().split(/\s+/);
+  const fenParts = trimmedFen.split(/\s+/);
   if (fenParts.length !== 6) {
     res.status(400).json({ error: 'Invalid FEN format (expected 6 fields).' });
     return;
@@ -21,7 +21,7 @@ function getBestMove(fen, difficulty) {
     const preset = DIFFICULTY_PRESETS[difficulty] || DIFFICULTY_PRESETS.intermediate;
     const engine = spawn(process.execPath, [ENGINE_PATH], { stdio: 'pipe' });
 
-    const outputLines = [];
+    let evaluation = null;
     let phase = 'uci';
     let settled = false;
 
@@ -41,26 +41,24 @@ function getBestMove(fen, difficulty) {
         if (settled) return;
         if (phase === 'uci' && line === 'uciok') {
           phase = 'ready';
-          engine.stdin.write(`setoption name Skill Level value ${preset.skillLevel}\n`);
-          engine.stdin.write('setoption name Threads value 1\n');
-          engine.stdin.write('ucinewgame\n');
-          engine.stdin.write('isready\n');
+          engine.stdin.write(
+            `setoption name Skill Level value ${preset.skillLevel}\n` +
+            'setoption name Threads value 1\n' +
+            'ucinewgame\n' +
+            'isready\n'
+          );
         } else if (phase === 'ready' && line === 'readyok') {
           phase = 'search';
-          engine.stdin.write(`position fen ${fen}\n`);
-          engine.stdin.write(`go depth ${preset.depth}\n`);
+          engine.stdin.write(`position fen ${fen}\ngo depth ${preset.depth}\n`);
         } else if (phase === 'search') {
-          outputLines.push(line);
-          if (line.startsWith('bestmove')) {
+          if (line.startsWith('info') && line.includes(' score ')) {
+            const m = line.match(/score\s+(cp|mate)\s+(-?\d+)/);
+            if (m) evaluation = { type: m[1], value: parseInt(m[2]) };
+          } else if (line.startsWith('bestmove')) {
             phase = 'done';
             engine.stdin.write('quit\n');
             const match = line.match(/bestmove\s+(\S+)/);
             if (!match) { finish(new Error('No bestmove')); return; }
-            let evaluation = null;
-            for (let i = outputLines.length - 1; i >= 0; i--) {
-              const m = outputLines[i].match(/score\s+(cp|mate)\s+(-?\d+)/);
-              if (m) { evaluation = { type: m[1], value: parseInt(m[2]) }; break; }
-            }
             finish(null, { move: match[1], evaluation });
           }
         }
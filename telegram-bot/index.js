@@ -88,17 +88,17 @@ function defaultState() {
 
 async function loadState(chatId) {
   try {
+    // Download directly and treat 404 as "no game yet" — saves an exists() round trip
     const file = storage.bucket(CONFIG.GCS_BUCKET).file(getStateFilePath(chatId));
-    const [exists] = await file.exists();
-    if (!exists) {
-      console.log(`[loadState] chatId=${chatId} no saved state, returning default`);
-      return defaultState();
-    }
     const [content] = await file.download();
     const state = JSON.parse(content.toString());
     console.log(`[loadState] chatId=${chatId} fen="${state.fen}" moveNumber=${state.moveNumber} active=${state.gameActive}`);
     return state;
   } catch (e) {
+    if (e.code === 404) {
+      console.log(`[loadState] chatId=${chatId} no saved state, returning default`);
+      return defaultState();
+    }
     console.error(`[loadState] chatId=${chatId} FAILED error="${e.message}" — returning default state`);
     return defaultState();
   }
@@ -141,24 +141,15 @@ async function sendTyping(chatId) {
 
 // --- BOARD RENDERING ---
 
+// FEN digit -> run of empty squares, so each rank expands in one replace().
+const EMPTY_RUNS = { 1: '.', 2: '..', 3: '...', 4: '....', 5: '.....', 6: '......', 7: '.......', 8: '........' };
+
 function renderBoard(fen) {
   const ranks = fen.split(' ')[0].split('/');
-  const whitePieces = { K: 'K', Q: 'Q', R: 'R', B: 'B', N: 'N', P: 'P' };
-  const blackPieces = { k: 'k', q: 'q', r: 'r', b: 'b', n: 'n', p: 'p' };
   let board = '';
   for (let i = 0; i < 8; i++) {
-    const rankNum = 8 - i;
-    let row = rankNum + '  ';
-    const rank = ranks[i];
-    for (let j = 0; j < rank.length; j++) {
-      const ch = rank[j];
-      if (ch >= '1' && ch <= '8') {
-        for (let k = 0; k < parseInt(ch, 10); k++) row += '.  ';
-      } else {
-        row += (whitePieces[ch] || blackPieces[ch] || ch) + '  ';
-      }
-    }
-    board += row.trimEnd() + '\n';
+    const squares = ranks[i].replace(/[1-8]/g, (d) => EMPTY_RUNS[d]);
+    board += (8 - i) + '  ' + squares.split('').join('  ') + '\n';
   }
   board += '\n   a  b  c  d  e  f  g  h';
   return '<pre>' + board + '</pre>';
@@ -166,7 +157,25 @@ function renderBoard(fen) {
 
 // --- STOCKFISH CLIENT ---
 
+// Reuse ID tokens across invocations on the same instance, refreshing
+// them a few minutes before the expiry recorded in the token itself.
+const ID_TOKEN_EXPIRY_MARGIN_MS = 5 * 60 * 1000;
+let idTokenCache = null; // { audience, token, expiresAt }
+
+/** Read the `exp` claim of a JWT as epoch milliseconds, or 0 if unreadable. */
+function getJwtExpiry(token) {
+  try {
+    const payload = JSON.parse(Buffer.from(token.split('.')[1], 'base64url').toString());
+    return typeof payload.exp === 'number' ? payload.exp * 1000 : 0;
+  } catch (_) {
+    return 0;
+  }
+}
+
 async function getIdToken(audience) {
+  if (idTokenCache && idTokenCache.audience === audience && Date.now() < idTokenCache.expiresAt) {
+    return idTokenCache.token;
+  }
   // When running on GCP, use the metadata server to get an ID token
   // for the Stockfish Cloud Function.
   const metadataUrl = `http://metadata.google.internal/computeMetadata/v1/instance/service-accounts/default/identity?audience=${encodeURIComponent(audience)}`;
@@ -176,7 +185,10 @@ async function getIdToken(audience) {
   if (!resp.ok) {
     throw new Error(`Failed to get ID token: ${resp.status} ${await resp.text()}`);
   }
-  return resp.text();
+  const token = await resp.text();
+  const expiresAt = getJwtExpiry(token) - ID_TOKEN_EXPIRY_MARGIN_MS;
+  idTokenCache = expiresAt > Date.now() ? { audience, token, expiresAt } : null;
+  return token;
 }
 
 async function callStockfish(fen, difficulty) {
@@ -194,6 +206,8 @@ async function callStockfish(fen, difficulty) {
   });
 
   if (!resp.ok) {
+    // Drop a rejected token so the next attempt fetches a fresh one
+    if (resp.status === 401 || resp.status === 403) idTokenCache = null;
     throw new Error(`Stockfish error (${resp.status}): ${await resp.text()}`);
   }
 
@@ -212,15 +226,13 @@ async function callStockfish(fen, difficulty) {
 
 // --- CLAUDE COMMENTARY ---
 
-async function getCommentary(playerMove, engineMove, state, evaluation) {
-  if (!CONFIG.ANTHROPIC_API_KEY) return '';
-  try {
-    const difficultyInstructions = {
-      beginner: 'The player is a beginner. Explain what the engine is trying to do in plain, jargon-free language. If the player made a mistake, gently explain what went wrong and what to watch out for.',
-      intermediate: 'The player is intermediate. Explain the strategic or tactical idea behind the engine\'s move — what threat it creates, what weakness it targets, or what positional advantage it gains. If the player\'s move was inaccurate, briefly explain why.',
-      advanced: 'The player is advanced. Give concise analytical commentary on the engine\'s plan and any inaccuracies in the player\'s move. Reference concrete variations or positional concepts where relevant.',
-    };
-    const systemPrompt = `You are a chess coach providing commentary on an ongoing game. The player is playing against a chess engine and wants to improve. Your job is to help them understand the position, not to tell them what to play next.
+const DIFFICULTY_INSTRUCTIONS = {
+  beginner: 'The player is a beginner. Explain what the engine is trying to do in plain, jargon-free language. If the player made a mistake, gently explain what went wrong and what to watch out for.',
+  intermediate: 'The player is intermediate. Explain the strategic or tactical idea behind the engine\'s move — what threat it creates, what weakness it targets, or what positional advantage it gains. If the player\'s move was inaccurate, briefly explain why.',
+  advanced: 'The player is advanced. Give concise analytical commentary on the engine\'s plan and any inaccuracies in the player\'s move. Reference concrete variations or positional concepts where relevant.',
+};
+
+const COMMENTARY_PROMPT_BASE = `You are a chess coach providing commentary on an ongoing game. The player is playing against a chess engine and wants to improve. Your job is to help them understand the position, not to tell them what to play next.
 
 For each pair of moves, comment in 2-3 sentences:
 1. Briefly assess the player's move — was it solid, inaccurate, or did it miss something? If the evaluation shifted significantly against them, explain why.
@@ -229,9 +241,17 @@ For each pair of moves, comment in 2-3 sentences:
 Rules:
 - Do NOT suggest or hint at the player's next move. Never say "you should consider" or "you might want to play".
 - When a move gives check (+), use the FEN to identify which piece actually attacks the king. A move like Nd3+ may be a discovered check (the knight unmasked a rook or bishop) rather than a direct check from the moving piece. Always attribute the check to the correct attacking piece.
-- Respond with plain text only, no JSON or markdown.
+- Respond with plain text only, no JSON or markdown.`;
+
+// System prompts only vary by difficulty, so build them once per instance.
+const COMMENTARY_PROMPTS = Object.fromEntries(
+  Object.entries(DIFFICULTY_INSTRUCTIONS).map(([level, text]) => [level, `${COMMENTARY_PROMPT_BASE}\n\n${text}`])
+);
 
-${difficultyInstructions[state.difficulty] || difficultyInstructions.intermediate}`;
+async function getCommentary(playerMove, engineMove, state, evaluation) {
+  if (!CONFIG.ANTHROPIC_API_KEY) return '';
+  try {
+    const systemPrompt = COMMENTARY_PROMPTS[state.difficulty] || COMMENTARY_PROMPTS.intermediate;
     const evalText = evaluation ? formatEvaluation(evaluation) : 'unavailable';
     const userMessage = `Position (after both moves): ${state.fen}\nMove history: ${state.moveHistory || '(start)'}\nPlayer (${state.playerColour}) played: ${playerMove}\nEngine replied: ${engineMove}\nEvaluation after engine move: ${evalText}`;
 
@@ -305,7 +325,7 @@ async function processMove(chatId, moveStr, state) {
   }
 
   const chess = new Chess(state.fen);
-  const fenTurn = state.fen.split(' ')[1];
+  const fenTurn = chess.turn();
   const expectedTurn = state.playerColour === 'white' ? 'w' : 'b';
   if (fenTurn !== expectedTurn) {
     await sendMessage(chatId, "It's not your turn.");
@@ -349,10 +369,11 @@ async function processMove(chatId, moveStr, state) {
   if (state.playerColour === 'black') state.moveNumber++;
 
   // Check if player's move ended the game
-  if (chess.in_checkmate() || chess.in_draw()) {
+  const playerMated = chess.in_checkmate();
+  if (playerMated || chess.in_draw()) {
     state.gameActive = false;
     await saveState(chatId, state);
-    const result = chess.in_checkmate() ? 'Checkmate!' : 'Draw!';
+    const result = playerMated ? 'Checkmate!' : 'Draw!';
     await sendMessage(chatId,
       `Your move: ${escapeHtml(playerSan)}\n\n${result}\n\n${renderBoard(state.fen)}\n\nHistory: ${escapeHtml(state.moveHistory)}\n\nSend /new to play again.`, 'HTML');
     return;
@@ -376,16 +397,15 @@ async function processMove(chatId, moveStr, state) {
     return;
   }
 
-  // Apply engine move
-  const engineChess = new Chess(state.fen);
+  // Apply engine move to the same board rather than re-parsing state.fen
   const uci = engineResult.move;
-  const engineMove = engineChess.move({
+  const engineMove = chess.move({
     from: uci.substring(0, 2),
     to: uci.substring(2, 4),
     promotion: uci.length > 4 ? uci[4] : undefined,
   });
   if (!engineMove) {
-    console.error(`[processMove] ENGINE_INVALID_MOVE uci="${uci}" fen="${state.fen}" legalMoves=[${engineChess.moves().join(', ')}]`);
+    console.error(`[processMove] ENGINE_INVALID_MOVE uci="${uci}" fen="${state.fen}" legalMoves=[${chess.moves().join(', ')}]`);
     // Player's move was already saved at this point, so state is safe — just roll back
     state.fen = prevFen;
     state.moveHistory = prevHistory;
@@ -400,19 +420,19 @@ async function processMove(chatId, moveStr, state) {
   const enginePrefix = engineColour === 'white'
     ? state.moveNumber + '.'
     : state.moveNumber + '...';
-  state.fen = engineChess.fen();
+  state.fen = chess.fen();
   state.moveHistory += ' ' + enginePrefix + engineSan;
   if (engineColour === 'black') state.moveNumber++;
 
   // Check for game over after engine move
   let gameOverText = '';
-  if (engineChess.in_checkmate()) {
+  if (chess.in_checkmate()) {
     state.gameActive = false;
     gameOverText = `\nCheckmate \u2014 ${engineColour} wins.\n\nSend /new to play again.`;
-  } else if (engineChess.in_draw()) {
+  } else if (chess.in_draw()) {
     state.gameActive = false;
-    const reason = engineChess.in_stalemate() ? 'stalemate' :
-      engineChess.in_threefold_repetition() ? 'threefold repetition' : 'draw';
+    const reason = chess.in_stalemate() ? 'stalemate' :
+      chess.in_threefold_repetition() ? 'threefold repetition' : 'draw';
     gameOverText = `\nDraw by ${reason}.\n\nSend /new to play again.`;
   }
 